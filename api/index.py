@@ -1,9 +1,20 @@
 """Vercel serverless entrypoint for the Flask app.
 
-This file exports a WSGI `app` object that @vercel/python detects automatically.
+This file exports a WSGI `app` callable that @vercel/python detects automatically.
+The Flask application is built on the first request rather than at import time.
 """
 import os
-from app import create_app
 
-flask_config = os.getenv('FLASK_CONFIG', 'production')
-app = create_app(flask_config)
\ No newline at end of file
+_app = None
+
+
+def _get_app():
+    global _app
+    if _app is None:
+        from app import create_app
+        _app = create_app(os.getenv('FLASK_CONFIG', 'production'))
+    return _app
+
+
+def app(environ, start_response):
+    return _get_app()(environ, start_response)
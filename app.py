@@ -9,4 +9,4 @@ def make_shell_context():
     return {'db': db, 'TowerCategory': TowerCategory, 'TowerVariant': TowerVariant, 'TowerDocument': TowerDocument}
 
 if __name__ == '__main__':
-    app.run(debug=True)
\ No newline at end of file
+    app.run(debug=os.environ.get('FLASK_DEBUG', '0') == '1')
\ No newline at end of file
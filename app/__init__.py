@@ -1,27 +1,102 @@
 from flask import Flask
+import click
 import os
+from jinja2 import FileSystemBytecodeCache
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
+from sqlalchemy import event
 from config import config
 from app.storage import storage
 
 db = SQLAlchemy()
 migrate = Migrate()
 
-def create_app(config_name='default'):
+def _sqlite_pragma_listener(pragmas):
+    """Build a connect listener that runs the given PRAGMA statements"""
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+    return set_pragmas
+
+def create_missing_tables():
+    """Create any model tables the database lacks; returns True if it had to"""
+    # One catalog query instead of create_all()'s per-table probes
+    existing = set(db.inspect(db.engine).get_table_names())
+    if existing.issuperset(db.metadata.tables):
+        return False
+    db.create_all()
+    return True
+
+def create_app(config_name=None):
+    config_name = config_name or os.getenv('FLASK_CONFIG') or 'default'
     # Use a writable instance path (Vercel is read-only except /tmp)
     instance_path = os.environ.get('INSTANCE_PATH', '/tmp')
     app = Flask(__name__, instance_path=instance_path)
     app.config.from_object(config[config_name])
     
+    # Keep compiled templates for the life of the process in production and
+    # share their bytecode across warm invocations. Jinja's default directory
+    # is per-user, created 0700 and ownership-checked before it is trusted.
+    if config_name == 'production':
+        app.jinja_env.auto_reload = False
+        app.jinja_env.cache = {}
+        app.jinja_env.bytecode_cache = FileSystemBytecodeCache()
+    
+    # Serialize jsonify() responses in C when orjson is installed
+    try:
+        from app.json_provider import OrjsonProvider
+        app.json = OrjsonProvider(app)
+    except ImportError:
+        pass
+    
     db.init_app(app)
     migrate.init_app(app, db)
+    
+    # Tune local SQLite connections (development only, see SQLITE_PRAGMAS)
+    pragmas = app.config.get('SQLITE_PRAGMAS')
+    if pragmas and app.config['SQLALCHEMY_DATABASE_URI'].startswith('sqlite'):
+        with app.app_context():
+            event.listen(db.engine, 'connect', _sqlite_pragma_listener(pragmas))
+    
     storage.init_app(app)
     
+    # Flag lazy-load N+1 queries during development when nplusone is installed
+    if app.config.get('NPLUSONE_ENABLED'):
+        try:
+            from nplusone.ext.flask_sqlalchemy import NPlusOne
+            NPlusOne(app)
+        except ImportError:
+            pass
+    
     from app.main import bp as main_bp
     app.register_blueprint(main_bp)
     
     from app.admin import bp as admin_bp
     app.register_blueprint(admin_bp, url_prefix='/admin')
     
+    # Built once per app; the processor hands back the same dict every time
+    from app.models import TowerCategory, TowerVariant, TowerDocument
+    shell_context = {
+        'db': db, 
+        'TowerCategory': TowerCategory, 
+        'TowerVariant': TowerVariant, 
+        'TowerDocument': TowerDocument
+    }
+    
+    @app.shell_context_processor
+    def make_shell_context():
+        """Make database models available in Flask shell"""
+        return shell_context
+    
+    # Create missing tables on demand rather than on the request path
+    @app.cli.command('init-db')
+    def init_db():
+        """Create database tables that do not exist yet"""
+        if create_missing_tables():
+            click.echo('Database tables created.')
+        else:
+            click.echo('Database tables already exist.')
+    
     return app
\ No newline at end of file
@@ -0,0 +1,48 @@
+"""
+Admin forms, imported from route bodies so the public site never loads WTForms
+"""
+
+from flask_wtf import FlaskForm
+from wtforms import StringField, TextAreaField, FloatField, SelectField, FileField, PasswordField, SubmitField, IntegerField, BooleanField
+from wtforms.validators import DataRequired, Length, NumberRange, URL, Optional
+
+class LoginForm(FlaskForm):
+    username = StringField('Username', validators=[DataRequired()])
+    password = PasswordField('Password', validators=[DataRequired()])
+    submit = SubmitField('Sign In')
+
+class CategoryForm(FlaskForm):
+    name = StringField('Category Name', validators=[DataRequired(), Length(min=2, max=100)])
+    description = TextAreaField('Description')
+    thumbnail_url = StringField('Thumbnail URL')
+    submit = SubmitField('Save Category')
+
+class VariantForm(FlaskForm):
+    tower_code = StringField('Tower Code', validators=[DataRequired(), Length(min=2, max=50)])
+    height = FloatField('Height (meters)', validators=[DataRequired(), NumberRange(min=0)])
+    structural_type = SelectField('Structural Type', 
+                                choices=[('self-supporting', 'Self-Supporting'),
+                                        ('guyed', 'Guyed'),
+                                        ('monopole', 'Monopole')],
+                                validators=[DataRequired()])
+    load_class = StringField('Load Class')
+    engineering_notes = TextAreaField('Engineering Notes')
+    category_id = SelectField('Category', coerce=int, validators=[DataRequired()])
+    # Document file (required on create, optional on edit; enforced in routes)
+    pdf_file = FileField('PDF File')
+    version = StringField('Version', default='1.0')
+    submit = SubmitField('Save Variant')
+
+class DocumentForm(FlaskForm):
+    pdf_file = FileField('PDF File', validators=[DataRequired()])
+    version = StringField('Version', default='1.0')
+    submit = SubmitField('Upload Document')
+
+class SliderForm(FlaskForm):
+    title = StringField('Title', validators=[DataRequired(), Length(min=2, max=200)])
+    description = TextAreaField('Description')
+    image_url = StringField('Image URL', validators=[DataRequired(), URL()])
+    link_url = StringField('Link URL', validators=[Optional(), URL()])
+    order = IntegerField('Display Order', default=0, validators=[NumberRange(min=0)])
+    is_active = BooleanField('Active', default=True)
+    submit = SubmitField('Save Slider')
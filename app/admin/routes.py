@@ -1,58 +1,28 @@
 from flask import render_template, request, redirect, url_for, flash, current_app, session
-from flask_wtf import FlaskForm
-from wtforms import StringField, TextAreaField, FloatField, SelectField, FileField, PasswordField, SubmitField, IntegerField, BooleanField
-from wtforms.validators import DataRequired, Length, NumberRange, URL, Optional
 from werkzeug.utils import secure_filename
 from app.admin import bp
-from app.models import TowerCategory, TowerVariant, TowerDocument, Slider, allowed_file
+from app.models import TowerCategory, TowerVariant, TowerDocument, Slider, allowed_file, get_index_counts, get_dashboard_counts, get_active_sliders
 from app import db
+from app.cache import cache
 from app.storage import storage
+from functools import wraps
+import hmac
 import os
 
-# Forms
-class LoginForm(FlaskForm):
-    username = StringField('Username', validators=[DataRequired()])
-    password = PasswordField('Password', validators=[DataRequired()])
-    submit = SubmitField('Sign In')
-class CategoryForm(FlaskForm):
-    name = StringField('Category Name', validators=[DataRequired(), Length(min=2, max=100)])
-    description = TextAreaField('Description')
-    thumbnail_url = StringField('Thumbnail URL')
-    submit = SubmitField('Save Category')
+@cache.memoize(timeout=300)
+def get_category_choices():
+    """Category dropdown choices for variant forms"""
+    return [(c.id, c.name) for c in TowerCategory.query.order_by('name').all()]
 
-class VariantForm(FlaskForm):
-    tower_code = StringField('Tower Code', validators=[DataRequired(), Length(min=2, max=50)])
-    height = FloatField('Height (meters)', validators=[DataRequired(), NumberRange(min=0)])
-    structural_type = SelectField('Structural Type', 
-                                choices=[('self-supporting', 'Self-Supporting'),
-                                        ('guyed', 'Guyed'),
-                                        ('monopole', 'Monopole')],
-                                validators=[DataRequired()])
-    load_class = StringField('Load Class')
-    engineering_notes = TextAreaField('Engineering Notes')
-    category_id = SelectField('Category', coerce=int, validators=[DataRequired()])
-    # Document file (required on create, optional on edit; enforced in routes)
-    pdf_file = FileField('PDF File')
-    version = StringField('Version', default='1.0')
-    submit = SubmitField('Save Variant')
-
-class DocumentForm(FlaskForm):
-    pdf_file = FileField('PDF File', validators=[DataRequired()])
-    version = StringField('Version', default='1.0')
-    submit = SubmitField('Upload Document')
-
-class SliderForm(FlaskForm):
-    title = StringField('Title', validators=[DataRequired(), Length(min=2, max=200)])
-    description = TextAreaField('Description')
-    image_url = StringField('Image URL', validators=[DataRequired(), URL()])
-    link_url = StringField('Link URL', validators=[Optional(), URL()])
-    order = IntegerField('Display Order', default=0, validators=[NumberRange(min=0)])
-    is_active = BooleanField('Active', default=True)
-    submit = SubmitField('Save Slider')
+def tower_code_taken(tower_code, exclude_id=None):
+    """Whether another variant already uses tower_code (checked before uploading its PDF)"""
+    query = db.select(TowerVariant.id).where(TowerVariant.tower_code == tower_code)
+    if exclude_id is not None:
+        query = query.where(TowerVariant.id != exclude_id)
+    return db.session.execute(query.limit(1)).first() is not None
 
 # Admin authentication decorator
 def admin_required(f):
-    from functools import wraps
     @wraps(f)
     def decorated_function(*args, **kwargs):
         if 'admin_logged_in' not in session:
@@ -65,6 +35,7 @@ def admin_required(f):
 @bp.route('/login', methods=['GET', 'POST'])
 def login():
     """Form-based admin login"""
+    from app.admin.forms import LoginForm
     form = LoginForm()
     next_url = request.args.get('next') or request.form.get('next')
     
@@ -72,8 +43,10 @@ def login():
         username = form.username.data
         password = form.password.data
         
-        if (username == current_app.config['ADMIN_USERNAME'] and 
-            password == current_app.config['ADMIN_PASSWORD']):
+        # Constant-time comparison; evaluate both so timing does not reveal which failed
+        username_ok = hmac.compare_digest(username.encode(), (current_app.config['ADMIN_USERNAME'] or '').encode())
+        password_ok = hmac.compare_digest(password.encode(), (current_app.config['ADMIN_PASSWORD'] or '').encode())
+        if username_ok and password_ok:
             session['admin_logged_in'] = True
             session.permanent = True
             flash('Login successful!', 'success')
@@ -97,12 +70,11 @@ def logout():
 @admin_required
 def dashboard():
     """Admin dashboard"""
-    categories_count = TowerCategory.query.count()
-    variants_count = TowerVariant.query.count()
-    documents_count = TowerDocument.query.count()
+    categories_count, variants_count, documents_count = get_dashboard_counts()
     
     recent_categories = TowerCategory.query.order_by(TowerCategory.created_at.desc()).limit(5).all()
-    recent_variants = TowerVariant.query.order_by(TowerVariant.created_at.desc()).limit(5).all()
+    recent_variants = TowerVariant.query.options(db.joinedload(TowerVariant.category))\
+                                       .order_by(TowerVariant.created_at.desc()).limit(5).all()
     
     return render_template('admin/dashboard.html',
                          categories_count=categories_count,
@@ -116,13 +88,15 @@ def dashboard():
 @admin_required
 def categories():
     """List all categories"""
-    categories = TowerCategory.query.order_by(TowerCategory.name).all()
+    categories = TowerCategory.query.options(db.undefer(TowerCategory.variant_count))\
+                                    .order_by(TowerCategory.name).all()
     return render_template('admin/categories.html', categories=categories)
 
 @bp.route('/category/new', methods=['GET', 'POST'])
 @admin_required
 def new_category():
     """Create new category"""
+    from app.admin.forms import CategoryForm
     form = CategoryForm()
     if form.validate_on_submit():
         category = TowerCategory(
@@ -132,6 +106,8 @@ def new_category():
         )
         db.session.add(category)
         db.session.commit()
+        cache.delete_memoized(get_category_choices)
+        cache.delete_memoized(get_dashboard_counts)
         flash('Category created successfully!', 'success')
         return redirect(url_for('admin.categories'))
     
@@ -141,6 +117,7 @@ def new_category():
 @admin_required
 def edit_category(category_id):
     """Edit existing category"""
+    from app.admin.forms import CategoryForm
     category = TowerCategory.query.get_or_404(category_id)
     form = CategoryForm(obj=category)
     
@@ -149,6 +126,8 @@ def edit_category(category_id):
         category.description = form.description.data
         category.thumbnail_url = form.thumbnail_url.data
         db.session.commit()
+        cache.delete_memoized(get_category_choices)
+        cache.delete_memoized(get_dashboard_counts)
         flash('Category updated successfully!', 'success')
         return redirect(url_for('admin.categories'))
     
@@ -158,9 +137,15 @@ def edit_category(category_id):
 @admin_required
 def delete_category(category_id):
     """Delete category"""
-    category = TowerCategory.query.get_or_404(category_id)
+    # Load the whole subtree up front so the ORM cascade does not lazy-load per variant
+    category = TowerCategory.query.options(
+        db.selectinload(TowerCategory.variants).selectinload(TowerVariant.documents)
+    ).get_or_404(category_id)
     db.session.delete(category)
     db.session.commit()
+    cache.delete_memoized(get_category_choices)
+    cache.delete_memoized(get_index_counts)
+    cache.delete_memoized(get_dashboard_counts)
     flash('Category deleted successfully!', 'success')
     return redirect(url_for('admin.categories'))
 
@@ -169,15 +154,18 @@ def delete_category(category_id):
 @admin_required
 def variants():
     """List all variants"""
-    variants = TowerVariant.query.order_by(TowerVariant.tower_code).all()
+    variants = TowerVariant.query.options(db.joinedload(TowerVariant.category),
+                                          db.undefer(TowerVariant.document_count))\
+                                 .order_by(TowerVariant.tower_code).all()
     return render_template('admin/variants.html', variants=variants)
 
 @bp.route('/variant/new', methods=['GET', 'POST'])
 @admin_required
 def new_variant():
     """Create new variant"""
+    from app.admin.forms import VariantForm
     form = VariantForm()
-    form.category_id.choices = [(c.id, c.name) for c in TowerCategory.query.order_by('name').all()]
+    form.category_id.choices = get_category_choices()
     
     if form.validate_on_submit():
         file = form.pdf_file.data
@@ -185,8 +173,21 @@ def new_variant():
         if not (file and hasattr(file, 'filename') and file.filename and allowed_file(file.filename)):
             flash('Invalid file type. Please upload a PDF file.', 'error')
             return render_template('admin/variant_form.html', form=form, title='New Variant')
+        # The PDF object name derives from the tower code; a duplicate would overwrite its file
+        if tower_code_taken(form.tower_code.data):
+            flash('A variant with this tower code already exists.', 'error')
+            return render_template('admin/variant_form.html', form=form, title='New Variant')
 
         try:
+            # Build filename using tower code and version
+            filename = secure_filename(f"{form.tower_code.data}_{(form.version.data or '1.0').strip()}.pdf")
+            # Upload before touching the database so no transaction spans the network call
+            pdf_url, pdf_info = storage.process_and_upload(file, filename)
+            if not pdf_url:
+                # Abort creation if upload fails
+                flash('There was an error uploading the PDF. Variant was not created.', 'error')
+                return render_template('admin/variant_form.html', form=form, title='New Variant')
+
             variant = TowerVariant(
                 tower_code=form.tower_code.data,
                 height=form.height.data,
@@ -195,39 +196,19 @@ def new_variant():
                 engineering_notes=form.engineering_notes.data,
                 category_id=form.category_id.data
             )
-            db.session.add(variant)
-            # Get variant.id without committing in case upload fails
-            db.session.flush()
-
-            # Extract PDF info (resets stream internally)
-            pdf_info = storage.get_pdf_info(file)
-            # Build filename using tower code and version
-            filename = secure_filename(f"{variant.tower_code}_{(form.version.data or '1.0').strip()}.pdf")
-            # Ensure stream at start for upload
-            try:
-                if hasattr(file, 'stream'):
-                    file.stream.seek(0)
-                else:
-                    file.seek(0)
-            except Exception:
-                pass
-            pdf_url = storage.upload_file(file, filename)
-            if not pdf_url:
-                # Abort creation if upload fails
-                db.session.rollback()
-                flash('There was an error uploading the PDF. Variant was not created.', 'error')
-                return render_template('admin/variant_form.html', form=form, title='New Variant')
-
             document = TowerDocument(
-                variant_id=variant.id,
+                variant=variant,
                 pdf_url=pdf_url,
                 page_count=pdf_info.get('page_count', 0),
                 file_size=pdf_info.get('file_size', 0),
                 version=(form.version.data or '1.0'),
                 is_active=True
             )
+            db.session.add(variant)
             db.session.add(document)
             db.session.commit()
+            cache.delete_memoized(get_index_counts)
+            cache.delete_memoized(get_dashboard_counts)
             flash('Variant and document uploaded successfully!', 'success')
             return redirect(url_for('admin.variants'))
         except Exception as e:
@@ -241,11 +222,16 @@ def new_variant():
 @admin_required
 def edit_variant(variant_id):
     """Edit existing variant"""
+    from app.admin.forms import VariantForm
     variant = TowerVariant.query.get_or_404(variant_id)
     form = VariantForm(obj=variant)
-    form.category_id.choices = [(c.id, c.name) for c in TowerCategory.query.order_by('name').all()]
+    form.category_id.choices = get_category_choices()
     
     if form.validate_on_submit():
+        # Check before assigning so neither autoflush nor the upload sees a duplicate code
+        if tower_code_taken(form.tower_code.data, exclude_id=variant.id):
+            flash('A variant with this tower code already exists.', 'error')
+            return render_template('admin/variant_form.html', form=form, variant=variant, title='Edit Variant')
         variant.tower_code = form.tower_code.data
         variant.height = form.height.data
         variant.structural_type = form.structural_type.data
@@ -259,25 +245,16 @@ def edit_variant(variant_id):
             if not allowed_file(file.filename):
                 flash('Invalid file type. Please upload a PDF file.', 'error')
                 return render_template('admin/variant_form.html', form=form, variant=variant, title='Edit Variant')
-            # Deactivate existing documents
-            TowerDocument.query.filter_by(variant_id=variant.id).update({'is_active': False})
-            # Extract PDF info
-            pdf_info = storage.get_pdf_info(file)
             # Build filename
             filename = secure_filename(f"{variant.tower_code}_{(form.version.data or '1.0').strip()}.pdf")
-            # Reset stream before upload
-            try:
-                if hasattr(file, 'stream'):
-                    file.stream.seek(0)
-                else:
-                    file.seek(0)
-            except Exception:
-                pass
-            pdf_url = storage.upload_file(file, filename)
+            # Upload first; deactivate and insert afterwards in the same commit
+            pdf_url, pdf_info = storage.process_and_upload(file, filename)
             if not pdf_url:
                 db.session.rollback()
                 flash('There was an error uploading the PDF. Changes not saved.', 'error')
                 return render_template('admin/variant_form.html', form=form, variant=variant, title='Edit Variant')
+            # Deactivate existing documents
+            TowerDocument.query.filter_by(variant_id=variant.id).update({'is_active': False})
             document = TowerDocument(
                 variant_id=variant.id,
                 pdf_url=pdf_url,
@@ -289,6 +266,8 @@ def edit_variant(variant_id):
             db.session.add(document)
         
         db.session.commit()
+        cache.delete_memoized(get_index_counts)
+        cache.delete_memoized(get_dashboard_counts)
         flash('Variant updated successfully!', 'success')
         return redirect(url_for('admin.variants'))
     
@@ -298,9 +277,11 @@ def edit_variant(variant_id):
 @admin_required
 def delete_variant(variant_id):
     """Delete variant"""
-    variant = TowerVariant.query.get_or_404(variant_id)
+    variant = TowerVariant.query.options(db.selectinload(TowerVariant.documents)).get_or_404(variant_id)
     db.session.delete(variant)
     db.session.commit()
+    cache.delete_memoized(get_index_counts)
+    cache.delete_memoized(get_dashboard_counts)
     flash('Variant deleted successfully!', 'success')
     return redirect(url_for('admin.variants'))
 
@@ -309,30 +290,28 @@ def delete_variant(variant_id):
 @admin_required
 def documents():
     """List all documents"""
-    documents = TowerDocument.query.order_by(TowerDocument.upload_timestamp.desc()).all()
+    documents = TowerDocument.query.options(db.joinedload(TowerDocument.variant).joinedload(TowerVariant.category))\
+                                   .order_by(TowerDocument.upload_timestamp.desc()).all()
     return render_template('admin/documents.html', documents=documents)
 
 @bp.route('/variant/<int:variant_id>/upload', methods=['GET', 'POST'])
 @admin_required
 def upload_document(variant_id):
     """Upload PDF document for variant"""
-    variant = TowerVariant.query.get_or_404(variant_id)
+    from app.admin.forms import DocumentForm
+    variant = TowerVariant.query.options(db.selectinload(TowerVariant.documents)).get_or_404(variant_id)
     form = DocumentForm()
     
     if form.validate_on_submit():
         file = form.pdf_file.data
         if file and allowed_file(file.filename):
-            # Deactivate existing documents
-            TowerDocument.query.filter_by(variant_id=variant_id).update({'is_active': False})
-            
-            # Get PDF info
-            pdf_info = storage.get_pdf_info(file)
-            
-            # Upload file
+            # Upload file, extracting PDF info from the same read
             filename = secure_filename(f"{variant.tower_code}_{form.version.data}.pdf")
-            pdf_url = storage.upload_file(file, filename)
+            pdf_url, pdf_info = storage.process_and_upload(file, filename)
             
             if pdf_url:
+                # Deactivate existing documents and insert the new one in one commit
+                TowerDocument.query.filter_by(variant_id=variant_id).update({'is_active': False})
                 document = TowerDocument(
                     variant_id=variant_id,
                     pdf_url=pdf_url,
@@ -343,6 +322,8 @@ def upload_document(variant_id):
                 )
                 db.session.add(document)
                 db.session.commit()
+                cache.delete_memoized(get_index_counts)
+                cache.delete_memoized(get_dashboard_counts)
                 flash('Document uploaded successfully!', 'success')
                 return redirect(url_for('admin.documents'))
             else:
@@ -364,6 +345,7 @@ def sliders():
 @admin_required
 def new_slider():
     """Create new slider"""
+    from app.admin.forms import SliderForm
     form = SliderForm()
     
     if form.validate_on_submit():
@@ -377,6 +359,7 @@ def new_slider():
         )
         db.session.add(slider)
         db.session.commit()
+        cache.delete_memoized(get_active_sliders)
         flash('Slider created successfully!', 'success')
         return redirect(url_for('admin.sliders'))
     
@@ -386,6 +369,7 @@ def new_slider():
 @admin_required
 def edit_slider(slider_id):
     """Edit existing slider"""
+    from app.admin.forms import SliderForm
     slider = Slider.query.get_or_404(slider_id)
     form = SliderForm(obj=slider)
     
@@ -397,6 +381,7 @@ def edit_slider(slider_id):
         slider.order = form.order.data
         slider.is_active = form.is_active.data
         db.session.commit()
+        cache.delete_memoized(get_active_sliders)
         flash('Slider updated successfully!', 'success')
         return redirect(url_for('admin.sliders'))
     
@@ -409,5 +394,6 @@ def delete_slider(slider_id):
     slider = Slider.query.get_or_404(slider_id)
     db.session.delete(slider)
     db.session.commit()
+    cache.delete_memoized(get_active_sliders)
     flash('Slider deleted successfully!', 'success')
     return redirect(url_for('admin.sliders'))
@@ -0,0 +1,75 @@
+"""
+In-process cache for hot read paths of the Tower Documentation System
+"""
+
+from functools import wraps
+import threading
+import time
+
+
+class SimpleCache:
+    """Thread-safe in-memory cache with per-entry timeouts"""
+
+    def __init__(self, default_timeout=300):
+        self.default_timeout = default_timeout
+        self._store = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """Return the cached value for key, or default if missing/expired"""
+        with self._lock:
+            entry = self._store.get(key)
+            if entry is None:
+                return default
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._store[key]
+                return default
+            return value
+
+    def set(self, key, value, timeout=None):
+        """Store value under key for timeout seconds"""
+        if timeout is None:
+            timeout = self.default_timeout
+        with self._lock:
+            self._store[key] = (value, time.monotonic() + timeout)
+
+    def delete(self, key):
+        """Remove a single key"""
+        with self._lock:
+            self._store.pop(key, None)
+
+    def clear(self):
+        """Remove every cached entry"""
+        with self._lock:
+            self._store.clear()
+
+    def memoize(self, timeout=None):
+        """Decorator caching a function's return value per call arguments"""
+        def decorator(f):
+            prefix = f'{f.__module__}.{f.__qualname__}'
+            missing = object()
+
+            @wraps(f)
+            def decorated_function(*args, **kwargs):
+                key = (prefix, args, tuple(sorted(kwargs.items())))
+                value = self.get(key, missing)
+                if value is missing:
+                    value = f(*args, **kwargs)
+                    self.set(key, value, timeout)
+                return value
+
+            decorated_function.cache_prefix = prefix
+            return decorated_function
+        return decorator
+
+    def delete_memoized(self, f):
+        """Drop every cached result of a memoized function"""
+        prefix = getattr(f, 'cache_prefix', None)
+        with self._lock:
+            for key in [k for k in self._store if isinstance(k, tuple) and k[0] == prefix]:
+                del self._store[key]
+
+
+# Initialize cache
+cache = SimpleCache()
@@ -1,22 +1,26 @@
-from flask import render_template, request, redirect, url_for, flash, current_app, jsonify, session
+from flask import render_template, request, redirect, url_for, flash, current_app, jsonify, session, g, abort, send_from_directory
 from app.main import bp
-from app.models import TowerCategory, TowerVariant, TowerDocument, Slider, VisitorStat
+from app.models import TowerCategory, TowerVariant, TowerDocument, VisitorStat, get_index_counts, get_active_sliders, get_visitor_total
 from app import db
+from app.cache import cache
+from app.storage import storage
 
 @bp.route('/')
 def index():
     """Home page - Display all tower categories"""
-    categories = TowerCategory.query.order_by(TowerCategory.name).all()
-    total_variants = TowerVariant.query.count()
-    total_documents = TowerDocument.query.count()
-    sliders = Slider.query.filter_by(is_active=True).order_by(Slider.order).all()
+    categories = TowerCategory.query.options(db.undefer(TowerCategory.variant_count))\
+                                    .order_by(TowerCategory.name).all()
+    total_variants, total_documents = get_index_counts()
+    sliders = get_active_sliders()
     return render_template('index.html', categories=categories, total_variants=total_variants, total_documents=total_documents, sliders=sliders)
 
 @bp.route('/category/<int:category_id>')
 def category_detail(category_id):
     """Tower category page - Display all variants in a category"""
     category = TowerCategory.query.get_or_404(category_id)
-    variants = TowerVariant.query.filter_by(category_id=category_id)\
+    variants = TowerVariant.query.options(db.joinedload(TowerVariant.category),
+                                          db.undefer(TowerVariant.document_count))\
+                                .filter_by(category_id=category_id)\
                                 .order_by(TowerVariant.height)\
                                 .all()
     return render_template('category_detail.html', category=category, variants=variants)
@@ -29,29 +33,35 @@ def health():
         'db': 'unknown',
         'cloudinary_configured': False,
     }
-    # DB check
+    # DB check on a bare connection, bypassing the ORM session
     try:
-        db.session.execute(db.text('SELECT 1'))
+        with db.engine.connect() as conn:
+            conn.exec_driver_sql('SELECT 1')
         status['db'] = 'ok'
     except Exception as e:
         status['db'] = f'error: {type(e).__name__}'
-    # Cloudinary config presence (no outbound call)
-    try:
-        from app.storage import cloudinary as _cloud
-        cfg = getattr(_cloud, 'config', None)
-        status['cloudinary_configured'] = bool(cfg and cfg().cloud_name)
-    except Exception:
-        status['cloudinary_configured'] = False
+    # Cloudinary config presence (no outbound call), resolved at startup
+    status['cloudinary_configured'] = storage.cloudinary_ready
     return jsonify(status), 200 if status['db'] == 'ok' else 503
 @bp.route('/variant/<int:variant_id>')
 def variant_detail(variant_id):
     """Tower variant detail page - Display variant info and PDF"""
-    variant = TowerVariant.query.get_or_404(variant_id)
-    document = TowerDocument.query.filter_by(variant_id=variant_id, is_active=True)\
-                                 .order_by(TowerDocument.upload_timestamp.desc())\
-                                 .first()
+    # Variant and category in one query, its documents in a second
+    variant = TowerVariant.query.options(db.joinedload(TowerVariant.category),
+                                         db.selectinload(TowerVariant.documents))\
+                                .get_or_404(variant_id)
+    # Newest active document, picked from the already-loaded collection
+    document = max((doc for doc in variant.documents if doc.is_active),
+                   key=lambda doc: doc.upload_timestamp, default=None)
     return render_template('variant_detail.html', variant=variant, document=document)
 
+@bp.route('/uploads/<path:filename>')
+def uploaded_file(filename):
+    """Serve PDFs saved by the local storage fallback with Range/ETag support"""
+    response = send_from_directory(storage.local_upload_dir(), filename, conditional=True, max_age=86400)
+    response.cache_control.public = True
+    return response
+
 @bp.route('/search')
 def search():
     """Search functionality for towers"""
@@ -60,12 +70,12 @@ def search():
         return redirect(url_for('main.index'))
     
     # Search in tower codes, categories, and structural types
-    variants = TowerVariant.query.filter(
+    variants = TowerVariant.query.options(db.joinedload(TowerVariant.category)).filter(
         (TowerVariant.tower_code.ilike(f'%{query}%')) |
         (TowerVariant.structural_type.ilike(f'%{query}%'))
     ).all()
     
-    categories = TowerCategory.query.filter(
+    categories = TowerCategory.query.options(db.undefer(TowerCategory.variant_count)).filter(
         TowerCategory.name.ilike(f'%{query}%')
     ).all()
     
@@ -84,58 +94,88 @@ def internal_error(error):
     return render_template('500.html'), 500
 
 # Count unique session visits across the public site
+_UNCOUNTED_ENDPOINTS = frozenset({'static', 'main.health', 'main.uploaded_file'})
+
 @bp.before_app_request
 def _count_visits_once_per_session():
+    # Skip unmatched URLs, admin routes, static files and monitor probes before
+    # touching the session, so asset responses do not get Vary: Cookie
+    endpoint = request.endpoint
+    if not endpoint or endpoint in _UNCOUNTED_ENDPOINTS or endpoint.startswith('admin.'):
+        return
+    if session.get('visitor_counted'):
+        return
     try:
-        # Skip admin routes and static files
-        if request.endpoint and (request.endpoint.startswith('admin.') or request.endpoint.startswith('static')):
-            return
+        # Atomic increment in SQL; seed the row on first ever visit
+        result = db.session.execute(
+            db.update(VisitorStat).values(
+                total_count=VisitorStat.total_count + 1,
+                last_visit=db.func.now()
+            )
+        )
+        if result.rowcount == 0:
+            db.session.add(VisitorStat(total_count=1))
+        db.session.commit()
+        cache.delete_memoized(get_visitor_total)
+        session['visitor_counted'] = True
     except Exception:
+        db.session.rollback()
+        # Do not block the request if counter fails
         pass
-    if not session.get('visitor_counted'):
-        try:
-            stat = VisitorStat.query.first()
-            if not stat:
-                stat = VisitorStat(total_count=0)
-                db.session.add(stat)
-            stat.total_count += 1
-            stat.last_visit = db.func.now()
-            db.session.commit()
-            session['visitor_counted'] = True
-        except Exception:
-            db.session.rollback()
-            # Do not block the request if counter fails
-            pass
+
+# Let browsers and the CDN reuse read-only public pages briefly
+_CACHEABLE_ENDPOINTS = frozenset({'main.index', 'main.category_detail', 'main.variant_detail', 'main.about'})
+
+@bp.after_request
+def _add_cache_headers(response):
+    if request.endpoint not in _CACHEABLE_ENDPOINTS or response.status_code != 200:
+        return response
+    # Pages that set a cookie (first visit, flashed message) must not be shared
+    if session.modified:
+        response.cache_control.private = True
+    else:
+        response.cache_control.public = True
+    response.cache_control.max_age = 60
+    response.add_etag()
+    return response.make_conditional(request)
 
 # Expose visitor total in templates rendered via this blueprint
 @bp.app_context_processor
 def inject_visitor_total():
-    try:
-        stat = VisitorStat.query.first()
-        return {'visitor_total': stat.total_count if stat else 0}
-    except Exception:
-        return {'visitor_total': 0}
+    # Reuse the value within a request and across requests for a short TTL
+    if '_visitor_total' not in g:
+        try:
+            g._visitor_total = get_visitor_total()
+        except Exception:
+            g._visitor_total = 0
+    return {'visitor_total': g._visitor_total}
 
 # About page
+_AUTHOR_NAME = 'Abel Ogbonna'
+_AUTHOR_ROLE = 'Author & Lead Specialist'
+_CONTACT_EMAIL = 'abel.ogbonna@yahoo.com'
+_CONTACT_PHONE = '+234 903 873 2209'
+_CONTACT_ADDRESS = 'Lagos, Nigeria'
+_SERVICES = (
+    'Telecom Tower Audit',
+    'Structural Analysis Audit',
+    'CAD Drafting',
+    'NQA [Grid, RFI, Solar, RMS & Power] Audit',
+    'Project Management [Relocation, Infra Work, Decommission and Retrieval tasks]',
+    'Telecom Tower Maintenance'
+)
+
 @bp.route('/about')
 def about():
     author = {
-        'name': 'Abel Ogbonna',
-        'role': 'Author & Lead Specialist',
+        'name': _AUTHOR_NAME,
+        'role': _AUTHOR_ROLE,
         'image_url': url_for('static', filename='images/author.jpg')
     }
     contact = {
-        'email': 'abel.ogbonna@yahoo.com',
-        'phone': '+234 903 873 2209',
-        'address': 'Lagos, Nigeria',
+        'email': _CONTACT_EMAIL,
+        'phone': _CONTACT_PHONE,
+        'address': _CONTACT_ADDRESS,
         'banner_image': url_for('static', filename='images/contact.JPG')
     }
-    services = [
-        'Telecom Tower Audit',
-        'Structural Analysis Audit',
-        'CAD Drafting',
-        'NQA [Grid, RFI, Solar, RMS & Power] Audit',
-        'Project Management [Relocation, Infra Work, Decommission and Retrieval tasks]',
-        'Telecom Tower Maintenance'
-    ]
-    return render_template('about.html', author=author, contact=contact, services=services)
+    return render_template('about.html', author=author, contact=contact, services=_SERVICES)
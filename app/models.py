@@ -1,5 +1,20 @@
-from datetime import datetime
 from app import db
+from app.cache import cache
+from app.security import ALLOWED_SUFFIXES
+
+class BulkCreateMixin:
+    """Adds a bulk_create() classmethod to models counted on the home page"""
+    
+    @classmethod
+    def bulk_create(cls, rows):
+        """Insert many rows from dicts with a single executemany INSERT"""
+        if not rows:
+            return
+        db.session.execute(db.insert(cls), rows)
+        db.session.commit()
+        cache.delete_memoized(get_index_counts)
+        cache.delete_memoized(get_dashboard_counts)
+
 
 class Slider(db.Model):
     __tablename__ = 'sliders'
@@ -11,8 +26,12 @@ class Slider(db.Model):
     link_url = db.Column(db.String(500))
     order = db.Column(db.Integer, default=0)
     is_active = db.Column(db.Boolean, default=True)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = db.Column(db.DateTime, server_default=db.func.now())
+    updated_at = db.Column(db.DateTime, server_default=db.func.now(), onupdate=db.func.now())
+    
+    __table_args__ = (
+        db.Index('ix_slider_active_order', 'is_active', 'order'),
+    )
     
     def __repr__(self):
         return f'<Slider {self.title}>'
@@ -34,7 +53,7 @@ class VisitorStat(db.Model):
 
     id = db.Column(db.Integer, primary_key=True)
     total_count = db.Column(db.Integer, default=0, nullable=False)
-    last_visit = db.Column(db.DateTime, default=datetime.utcnow)
+    last_visit = db.Column(db.DateTime, server_default=db.func.now())
 
     def __repr__(self):
         return f'<VisitorStat total={self.total_count}>'
@@ -46,11 +65,11 @@ class TowerCategory(db.Model):
     name = db.Column(db.String(100), unique=True, nullable=False, index=True)
     description = db.Column(db.Text)
     thumbnail_url = db.Column(db.String(500))
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = db.Column(db.DateTime, server_default=db.func.now())
+    updated_at = db.Column(db.DateTime, server_default=db.func.now(), onupdate=db.func.now())
     
     # Relationship with variants
-    variants = db.relationship('TowerVariant', backref='category', lazy='dynamic', cascade='all, delete-orphan')
+    variants = db.relationship('TowerVariant', backref='category', lazy='select', cascade='all, delete-orphan')
     
     def __repr__(self):
         return f'<TowerCategory {self.name}>'
@@ -61,10 +80,10 @@ class TowerCategory(db.Model):
             'name': self.name,
             'description': self.description,
             'thumbnail_url': self.thumbnail_url,
-            'variant_count': self.variants.count()
+            'variant_count': self.variant_count
         }
 
-class TowerVariant(db.Model):
+class TowerVariant(BulkCreateMixin, db.Model):
     __tablename__ = 'tower_variants'
     
     id = db.Column(db.Integer, primary_key=True)
@@ -74,11 +93,15 @@ class TowerVariant(db.Model):
     load_class = db.Column(db.String(20))
     engineering_notes = db.Column(db.Text)
     category_id = db.Column(db.Integer, db.ForeignKey('tower_categories.id'), nullable=False)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = db.Column(db.DateTime, server_default=db.func.now())
+    updated_at = db.Column(db.DateTime, server_default=db.func.now(), onupdate=db.func.now())
+    
+    __table_args__ = (
+        db.Index('ix_variant_category_height', 'category_id', 'height'),
+    )
     
     # Relationship with documents
-    documents = db.relationship('TowerDocument', backref='variant', lazy='dynamic', cascade='all, delete-orphan')
+    documents = db.relationship('TowerDocument', backref='variant', lazy='select', cascade='all, delete-orphan')
     
     def __repr__(self):
         return f'<TowerVariant {self.tower_code}>'
@@ -93,10 +116,10 @@ class TowerVariant(db.Model):
             'engineering_notes': self.engineering_notes,
             'category_id': self.category_id,
             'category_name': self.category.name if self.category else None,
-            'document_count': self.documents.count()
+            'document_count': self.document_count
         }
 
-class TowerDocument(db.Model):
+class TowerDocument(BulkCreateMixin, db.Model):
     __tablename__ = 'tower_documents'
     
     id = db.Column(db.Integer, primary_key=True)
@@ -105,9 +128,13 @@ class TowerDocument(db.Model):
     page_count = db.Column(db.Integer)
     version = db.Column(db.String(20), default='1.0')
     file_size = db.Column(db.Integer)  # in bytes
-    upload_timestamp = db.Column(db.DateTime, default=datetime.utcnow)
+    upload_timestamp = db.Column(db.DateTime, server_default=db.func.now())
     is_active = db.Column(db.Boolean, default=True)
     
+    __table_args__ = (
+        db.Index('ix_doc_variant_active_ts', variant_id, is_active, upload_timestamp.desc()),
+    )
+    
     def __repr__(self):
         return f'<TowerDocument {self.id} for {self.variant.tower_code if self.variant else "Unknown"}>'
     
@@ -125,8 +152,63 @@ class TowerDocument(db.Model):
         }
 
 
+# Child counts as correlated subqueries; deferred so only pages that
+# undefer() them pay for the count, and then on the same SELECT
+TowerCategory.variant_count = db.column_property(
+    db.select(db.func.count(TowerVariant.id))
+      .where(TowerVariant.category_id == TowerCategory.id)
+      .correlate_except(TowerVariant)
+      .scalar_subquery(),
+    deferred=True
+)
+
+TowerVariant.document_count = db.column_property(
+    db.select(db.func.count(TowerDocument.id))
+      .where(TowerDocument.variant_id == TowerVariant.id)
+      .correlate_except(TowerDocument)
+      .scalar_subquery(),
+    deferred=True
+)
+
+
 # Helper function to check allowed file extensions
 def allowed_file(filename):
-    ALLOWED_EXTENSIONS = {'pdf'}
-    return '.' in filename and \
-           filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+    return filename.lower().endswith(ALLOWED_SUFFIXES)
+
+
+# Cached aggregates for the public home page (busted by admin mutators)
+@cache.memoize(timeout=300)
+def get_index_counts():
+    """Return (variant_count, document_count) in a single round-trip"""
+    row = db.session.execute(db.select(
+        db.select(db.func.count(TowerVariant.id)).scalar_subquery(),
+        db.select(db.func.count(TowerDocument.id)).scalar_subquery()
+    )).one()
+    return row[0], row[1]
+
+# Admin dashboard totals (busted by the same mutators as get_index_counts)
+@cache.memoize(timeout=30)
+def get_dashboard_counts():
+    """Return (category, variant, document) counts in a single round-trip"""
+    row = db.session.execute(db.select(
+        db.select(db.func.count(TowerCategory.id)).scalar_subquery(),
+        db.select(db.func.count(TowerVariant.id)).scalar_subquery(),
+        db.select(db.func.count(TowerDocument.id)).scalar_subquery()
+    )).one()
+    return row[0], row[1], row[2]
+
+@cache.memoize(timeout=300)
+def get_active_sliders():
+    # Plain column rows: no ORM identity-map objects or per-row to_dict()
+    rows = db.session.execute(
+        db.select(Slider.id, Slider.title, Slider.description, Slider.image_url,
+                  Slider.link_url, Slider.order, Slider.is_active)
+          .where(Slider.is_active.is_(True))
+          .order_by(Slider.order)
+    ).mappings()
+    return [dict(row) for row in rows]
+
+@cache.memoize(timeout=30)
+def get_visitor_total():
+    total = db.session.execute(db.select(VisitorStat.total_count).limit(1)).scalar()
+    return total or 0
@@ -3,10 +3,52 @@ Security utilities for Tower Documentation System
 """
 
 from functools import wraps
-from flask import request, redirect, url_for, current_app, session
+from flask import request, redirect, url_for, current_app, session, g
 from werkzeug.security import check_password_hash, generate_password_hash
+from functools import lru_cache
+from app.cache import cache
+from config import ALLOWED_EXTENSIONS
+import hashlib
+import hmac
 import secrets
+import time
 import re
+try:
+    import redis
+except Exception:
+    redis = None
+
+_redis_client = None
+
+# Patterns compiled once at import instead of on every validation call
+_RE_EMAIL = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+_RE_URL = re.compile(r'^https?://[^\s/$.?#].[^\s]*$')
+
+# Accepted upload types
+ALLOWED_SUFFIXES = tuple(f'.{ext}' for ext in sorted(ALLOWED_EXTENSIONS))
+_PDF_MAGIC = b'%PDF-'
+
+# PBKDF2 rounds tuned for ~50ms verification on serverless CPUs; the method is
+# stored in each hash, so existing hashes keep verifying with their own rounds
+PASSWORD_HASH_METHOD = 'pbkdf2:sha256:120000'
+
+# Cookie carrying the double-submit CSRF token
+CSRF_COOKIE_NAME = 'csrf'
+
+# Seconds a successful password verification is remembered
+VERIFIED_PASSWORD_TTL = 300
+
+# Password character classes tracked as bit flags in a single pass
+_HAS_UPPER, _HAS_LOWER, _HAS_DIGIT = 1, 2, 4
+_ALL_CLASSES = _HAS_UPPER | _HAS_LOWER | _HAS_DIGIT
+
+# Path separators and characters unsafe in filenames, deleted via str.translate
+_BAD_FILENAME_CHARS = str.maketrans('', '', '<>:"/\\|?*')
+
+@lru_cache(maxsize=128)
+def _compile_pattern(pattern):
+    """Compile and memoize caller-supplied validation patterns"""
+    return re.compile(pattern)
 
 
 class SecurityManager:
@@ -23,13 +65,24 @@ class SecurityManager:
         if len(password) < 8:
             return False, "Password must be at least 8 characters long"
         
-        if not re.search(r'[A-Z]', password):
+        flags = 0
+        for char in password:
+            if 'A' <= char <= 'Z':
+                flags |= _HAS_UPPER
+            elif 'a' <= char <= 'z':
+                flags |= _HAS_LOWER
+            elif char.isdecimal():
+                flags |= _HAS_DIGIT
+            if flags == _ALL_CLASSES:
+                break
+        
+        if not flags & _HAS_UPPER:
             return False, "Password must contain at least one uppercase letter"
         
-        if not re.search(r'[a-z]', password):
+        if not flags & _HAS_LOWER:
             return False, "Password must contain at least one lowercase letter"
         
-        if not re.search(r'\d', password):
+        if not flags & _HAS_DIGIT:
             return False, "Password must contain at least one digit"
         
         return True, "Password is valid"
@@ -37,19 +90,28 @@ class SecurityManager:
     @staticmethod
     def hash_password(password):
         """Hash a password securely"""
-        return generate_password_hash(password)
+        return generate_password_hash(password, method=PASSWORD_HASH_METHOD)
     
     @staticmethod
     def verify_password(hashed_password, password):
         """Verify a password against its hash"""
-        return check_password_hash(hashed_password, password)
+        # Successful checks are remembered for a few minutes under a keyed
+        # digest of the password (never the plaintext); a new hash misses
+        digest = hmac.new(current_app.config['SECRET_KEY'].encode(), password.encode(), hashlib.sha256).hexdigest()
+        key = ('verified_password', hashed_password, digest)
+        if cache.get(key):
+            return True
+        if check_password_hash(hashed_password, password):
+            cache.set(key, True, timeout=VERIFIED_PASSWORD_TTL)
+            return True
+        return False
     
     @staticmethod
     def sanitize_filename(filename):
         """Sanitize filename to prevent directory traversal"""
         # Remove path separators and dangerous characters
-        filename = re.sub(r'[<>:"/\\|?*]', '', filename)
-        filename = re.sub(r'\.\.', '', filename)  # Remove directory traversal
+        filename = filename.translate(_BAD_FILENAME_CHARS)
+        filename = filename.replace('..', '')  # Remove directory traversal
         filename = filename.strip('. ')  # Remove leading/trailing dots and spaces
         
         # Limit filename length
@@ -63,13 +125,11 @@ class SecurityManager:
     def validate_file_upload(file):
         """Validate uploaded file for security"""
         # Check file extension
-        allowed_extensions = {'pdf'}
         if '.' not in file.filename:
             return False, "File must have an extension"
         
-        extension = file.filename.rsplit('.', 1)[1].lower()
-        if extension not in allowed_extensions:
-            return False, f"Only {', '.join(allowed_extensions)} files are allowed"
+        if not file.filename.lower().endswith(ALLOWED_SUFFIXES):
+            return False, f"Only {', '.join(sorted(ALLOWED_EXTENSIONS))} files are allowed"
         
         # Check file size (50MB max)
         max_size = 50 * 1024 * 1024
@@ -80,6 +140,13 @@ class SecurityManager:
         if file.mimetype != 'application/pdf':
             return False, "File must be a PDF"
         
+        # Check content signature so a renamed file is rejected before upload
+        stream = file.stream if hasattr(file, 'stream') else file
+        header = stream.read(len(_PDF_MAGIC))
+        stream.seek(0)
+        if header != _PDF_MAGIC:
+            return False, "File must be a PDF"
+        
         return True, "File is valid"
 
 def admin_required(f):
@@ -95,8 +162,9 @@ def admin_required(f):
         if not auth:
             return redirect(url_for('admin.login'))
         
-        if (auth.username == current_app.config['ADMIN_USERNAME'] and 
-            auth.password == current_app.config['ADMIN_PASSWORD']):
+        username_ok = hmac.compare_digest((auth.username or '').encode(), (current_app.config['ADMIN_USERNAME'] or '').encode())
+        password_ok = hmac.compare_digest((auth.password or '').encode(), (current_app.config['ADMIN_PASSWORD'] or '').encode())
+        if username_ok and password_ok and auth.password:
             # Set session for future requests
             session['admin_logged_in'] = True
             session.permanent = True
@@ -107,28 +175,47 @@ def admin_required(f):
     return decorated_function
 
 def csrf_protect():
-    """Generate CSRF token for forms"""
-    if 'csrf_token' not in session:
-        session['csrf_token'] = SecurityManager.generate_secure_token()
-    return session['csrf_token']
+    """Return the double-submit CSRF token for forms"""
+    # The token lives in its own cookie, so rendering a form never rewrites the session
+    if 'csrf_token' not in g:
+        g.csrf_token = request.cookies.get(CSRF_COOKIE_NAME) or SecurityManager.generate_secure_token()
+    return g.csrf_token
 
 def verify_csrf_token(token):
-    """Verify CSRF token"""
-    return token == session.get('csrf_token')
+    """Verify a submitted CSRF token against the CSRF cookie"""
+    cookie_token = request.cookies.get(CSRF_COOKIE_NAME)
+    if not token or not cookie_token:
+        return False
+    return hmac.compare_digest(token.encode(), cookie_token.encode())
+
+def _get_redis():
+    """Shared Redis client for REDIS_URL, or None when not configured"""
+    global _redis_client
+    if _redis_client is None:
+        url = current_app.config.get('REDIS_URL')
+        if not (redis and url):
+            return None
+        _redis_client = redis.Redis.from_url(url)
+    return _redis_client
 
 def rate_limit_check(identifier, limit=5, window=300):
-    """Simple rate limiting implementation"""
-    # This is a basic implementation - in production, use Redis or similar
-    if 'rate_limits' not in session:
-        session['rate_limits'] = {}
+    """Fixed-window rate limiting shared across workers via Redis INCR/EXPIRE"""
+    now = int(time.time())
+    key = f"rl:{identifier}:{now // window}"
     
-    now = int(datetime.utcnow().timestamp())
-    key = f"{identifier}:{now // window}"
+    client = _get_redis()
+    if client is not None:
+        count = client.incr(key)
+        if count == 1:
+            client.expire(key, window)
+        return count <= limit
     
-    if key not in session['rate_limits']:
-        session['rate_limits'][key] = 0
+    # Without Redis fall back to per-client counters in the session
+    if 'rate_limits' not in session:
+        session['rate_limits'] = {}
     
-    session['rate_limits'][key] += 1
+    session['rate_limits'][key] = session['rate_limits'].get(key, 0) + 1
+    session.modified = True
     
     # Clean old entries
     old_keys = [k for k in session['rate_limits'].keys() 
@@ -156,13 +243,11 @@ def validate_input(data, rules):
         # Type validation
         if 'type' in rule:
             if rule['type'] == 'email':
-                email_pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-                if not re.match(email_pattern, value):
+                if not _RE_EMAIL.match(value):
                     errors[field] = "Invalid email format"
             
             elif rule['type'] == 'url':
-                url_pattern = r'^https?://[^\s/$.?#].[^\s]*$'
-                if not re.match(url_pattern, value):
+                if not _RE_URL.match(value):
                     errors[field] = "Invalid URL format"
             
             elif rule['type'] == 'numeric':
@@ -180,20 +265,19 @@ def validate_input(data, rules):
         
         # Pattern validation
         if 'pattern' in rule:
-            if not re.match(rule['pattern'], value):
+            if not _compile_pattern(rule['pattern']).match(value):
                 errors[field] = rule.get('error_message', 'Invalid format')
     
     return errors
 
 # Security headers middleware
-def add_security_headers(response):
-    """Add security headers to responses"""
-    response.headers['X-Content-Type-Options'] = 'nosniff'
-    response.headers['X-Frame-Options'] = 'DENY'
-    response.headers['X-XSS-Protection'] = '1; mode=block'
-    response.headers['Strict-Transport-Security'] = 'max-age=31536000; includeSubDomains'
-    response.headers['Referrer-Policy'] = 'strict-origin-when-cross-origin'
-    response.headers['Content-Security-Policy'] = (
+_SECURITY_HEADERS = (
+    ('X-Content-Type-Options', 'nosniff'),
+    ('X-Frame-Options', 'DENY'),
+    ('X-XSS-Protection', '1; mode=block'),
+    ('Strict-Transport-Security', 'max-age=31536000; includeSubDomains'),
+    ('Referrer-Policy', 'strict-origin-when-cross-origin'),
+    ('Content-Security-Policy', (
         "default-src 'self'; "
         "script-src 'self' 'unsafe-inline' https://cdn.tailwindcss.com https://cdnjs.cloudflare.com; "
         "style-src 'self' 'unsafe-inline' https://cdn.tailwindcss.com https://cdnjs.cloudflare.com; "
@@ -201,5 +285,16 @@ def add_security_headers(response):
         "font-src 'self' https://cdnjs.cloudflare.com; "
         "connect-src 'self'; "
         "frame-src 'self';"
-    )
+    )),
+)
+
+def add_security_headers(response):
+    """Add security headers to responses"""
+    for name, value in _SECURITY_HEADERS:
+        response.headers[name] = value
+    # Issue the CSRF cookie only when a token was minted for this request
+    token = g.get('csrf_token')
+    if token and token != request.cookies.get(CSRF_COOKIE_NAME):
+        response.set_cookie(CSRF_COOKIE_NAME, token, secure=request.is_secure,
+                            httponly=True, samesite='Lax')
     return response
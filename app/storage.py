@@ -1,78 +1,169 @@
 import os
-import boto3
-from botocore.exceptions import NoCredentialsError, ClientError
 from werkzeug.utils import secure_filename
-from PyPDF2 import PdfReader
-import io
-try:
-    import cloudinary
-    import cloudinary.uploader
-except Exception:
-    cloudinary = None
+import shutil
+import time
+
+# boto3, PyPDF2 and cloudinary are imported where they are used so that a
+# cold start serving read-only pages never loads them
+
+
+def _import_cloudinary():
+    """Import the optional Cloudinary SDK, or return None if unavailable"""
+    try:
+        import cloudinary
+        import cloudinary.uploader
+        return cloudinary
+    except Exception:
+        return None
+
+
+class _NonClosingStream:
+    """File-like proxy that ignores close() so an uploader cannot close the request stream"""
+    
+    def __init__(self, stream):
+        self._stream = stream
+    
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        return False
+    
+    def close(self):
+        pass
+
+
+def _count_pages(stream):
+    """Read the page count from the catalog's /Pages /Count without walking the page tree"""
+    try:
+        import pikepdf
+    except ImportError:
+        pikepdf = None
+    if pikepdf:
+        try:
+            with pikepdf.open(_NonClosingStream(stream)) as pdf:
+                return int(pdf.Root.Pages.Count)
+        except Exception:
+            stream.seek(0)
+    
+    from PyPDF2 import PdfReader
+    pdf_reader = PdfReader(stream, strict=False)
+    try:
+        return int(pdf_reader.trailer['/Root']['/Pages']['/Count'])
+    except (KeyError, TypeError, ValueError):
+        # Malformed catalog: fall back to a full page-tree traversal
+        return len(pdf_reader.pages)
 
 class CloudStorage:
     def __init__(self, app=None):
         self.app = app
         self.s3_client = None
         self.bucket_name = None
+        self.s3_transfer_config = None
+        self.s3_url_prefix = None
+        self.s3_enabled = False
+        self.cloudinary_ready = False
+        self._cloudinary = None
         if app:
             self.init_app(app)
     
     def init_app(self, app):
         self.app = app
         self.bucket_name = app.config.get('AWS_STORAGE_BUCKET_NAME')
-        # Configure Cloudinary if present
-        if cloudinary:
-            if app.config.get('CLOUDINARY_URL'):
-                cloudinary.config(cloudinary_url=app.config['CLOUDINARY_URL'])
-            elif app.config.get('CLOUDINARY_CLOUD_NAME') and app.config.get('CLOUDINARY_API_KEY') and app.config.get('CLOUDINARY_API_SECRET'):
-                cloudinary.config(
-                    cloud_name=app.config['CLOUDINARY_CLOUD_NAME'],
-                    api_key=app.config['CLOUDINARY_API_KEY'],
-                    api_secret=app.config['CLOUDINARY_API_SECRET']
-                )
+        # Decide backends from config alone; the SDKs are imported on the first upload
+        self._cloudinary = None
+        self.cloudinary_ready = bool(
+            app.config.get('CLOUDINARY_URL') or (
+                app.config.get('CLOUDINARY_CLOUD_NAME') and
+                app.config.get('CLOUDINARY_API_KEY') and
+                app.config.get('CLOUDINARY_API_SECRET')
+            )
+        )
         
-        # Initialize S3 client only if credentials are available
-        if app.config.get('AWS_ACCESS_KEY_ID') and app.config.get('AWS_SECRET_ACCESS_KEY'):
+        # S3 is used only if credentials are available
+        self.s3_client = None
+        self.s3_transfer_config = None
+        self.s3_enabled = bool(app.config.get('AWS_ACCESS_KEY_ID') and app.config.get('AWS_SECRET_ACCESS_KEY'))
+        if self.s3_enabled:
+            if app.config.get('AWS_S3_ENDPOINT_URL'):
+                self.s3_url_prefix = f"{app.config['AWS_S3_ENDPOINT_URL']}/{self.bucket_name}/"
+            else:
+                self.s3_url_prefix = f"https://{self.bucket_name}.s3.{app.config.get('AWS_S3_REGION', 'us-east-1')}.amazonaws.com/"
+    
+    def _get_cloudinary(self):
+        """Import and configure the Cloudinary SDK on first use, or None if unavailable"""
+        if self._cloudinary is None and self.cloudinary_ready:
+            cloudinary = _import_cloudinary()
+            if cloudinary:
+                if self.app.config.get('CLOUDINARY_URL'):
+                    cloudinary.config(cloudinary_url=self.app.config['CLOUDINARY_URL'])
+                else:
+                    cloudinary.config(
+                        cloud_name=self.app.config['CLOUDINARY_CLOUD_NAME'],
+                        api_key=self.app.config['CLOUDINARY_API_KEY'],
+                        api_secret=self.app.config['CLOUDINARY_API_SECRET']
+                    )
+                self._cloudinary = cloudinary
+        return self._cloudinary
+    
+    def _get_s3_client(self):
+        """Create the S3 client and transfer config on first use, or None without credentials"""
+        if self.s3_client is None and self.s3_enabled:
+            import boto3
+            from boto3.s3.transfer import TransferConfig
+            
+            # Upload in fixed-size parts so peak memory stays bounded by one chunk;
+            # S3 sends up to UPLOAD_PARALLELISM parts concurrently
+            chunk_size = self.app.config.get('UPLOAD_CHUNK_SIZE', 8 * 1024 * 1024)
+            self.s3_transfer_config = TransferConfig(
+                multipart_threshold=chunk_size,
+                multipart_chunksize=chunk_size,
+                max_concurrency=self.app.config.get('UPLOAD_PARALLELISM', 4),
+                use_threads=True
+            )
             self.s3_client = boto3.client(
                 's3',
-                aws_access_key_id=app.config.get('AWS_ACCESS_KEY_ID'),
-                aws_secret_access_key=app.config.get('AWS_SECRET_ACCESS_KEY'),
-                region_name=app.config.get('AWS_S3_REGION', 'us-east-1'),
-                endpoint_url=app.config.get('AWS_S3_ENDPOINT_URL')
+                aws_access_key_id=self.app.config.get('AWS_ACCESS_KEY_ID'),
+                aws_secret_access_key=self.app.config.get('AWS_SECRET_ACCESS_KEY'),
+                region_name=self.app.config.get('AWS_S3_REGION', 'us-east-1'),
+                endpoint_url=self.app.config.get('AWS_S3_ENDPOINT_URL')
             )
+        return self.s3_client
     
     def upload_file(self, file, object_name=None):
         """Upload a file to Cloudinary (preferred), S3/Wasabi, or local."""
         # Prefer Cloudinary when configured (best for serverless like Vercel)
-        if cloudinary and cloudinary.config().cloud_name:
+        if self.cloudinary_ready:
             url = self._upload_cloudinary(file, object_name)
             if url:
                 return url
+            # Rewind what the failed Cloudinary attempt consumed
+            (file.stream if hasattr(file, 'stream') else file).seek(0)
         
-        if not self.s3_client:
+        s3_client = self._get_s3_client()
+        if not s3_client:
             # Fallback to local storage if S3 is not configured
             return self._upload_local(file, object_name)
         
+        from botocore.exceptions import NoCredentialsError, ClientError
+        
         if object_name is None:
             object_name = secure_filename(file.filename)
         
         try:
             # Upload file
-            self.s3_client.upload_fileobj(
+            s3_client.upload_fileobj(
                 file,
                 self.bucket_name,
                 object_name,
-                ExtraArgs={'ContentType': 'application/pdf'}
+                ExtraArgs={'ContentType': 'application/pdf'},
+                Config=self.s3_transfer_config
             )
             
-            # Generate URL
-            if self.app.config.get('AWS_S3_ENDPOINT_URL'):
-                url = f"{self.app.config['AWS_S3_ENDPOINT_URL']}/{self.bucket_name}/{object_name}"
-            else:
-                url = f"https://{self.bucket_name}.s3.{self.app.config.get('AWS_S3_REGION', 'us-east-1')}.amazonaws.com/{object_name}"
-            
-            return url
+            return self.s3_url_prefix + object_name
             
         except NoCredentialsError:
             print("Credentials not available, falling back to local storage")
@@ -81,59 +172,87 @@ class CloudStorage:
             print(f"Error uploading to S3: {e}")
             return None
     
+    def local_upload_dir(self):
+        """Directory used by the local storage fallback"""
+        return os.path.join(self.app.root_path, '..', 'uploads')
+    
     def _upload_local(self, file, object_name=None):
         """Fallback local storage method"""
         if object_name is None:
             object_name = secure_filename(file.filename)
         
-        upload_dir = os.path.join(self.app.root_path, '..', 'uploads')
+        upload_dir = self.local_upload_dir()
         os.makedirs(upload_dir, exist_ok=True)
         
         file_path = os.path.join(upload_dir, object_name)
-        file.save(file_path)
+        if hasattr(file, 'save'):
+            file.save(file_path)
+        else:
+            file.seek(0)
+            with open(file_path, 'wb') as out:
+                shutil.copyfileobj(file, out)
         
         # Return relative URL for local development
         return f"/uploads/{object_name}"
 
     def _upload_cloudinary(self, file, object_name=None):
         """Upload PDF to Cloudinary as raw resource and return secure URL."""
+        cloudinary = self._get_cloudinary()
         if not cloudinary:
             return None
         if object_name is None:
             object_name = secure_filename(file.filename)
         folder = self.app.config.get('CLOUDINARY_FOLDER', 'tower-docs')
-        # Ensure stream pointer at start
-        try:
-            if hasattr(file, 'stream'):
-                file.stream.seek(0)
-            else:
-                file.seek(0)
-            res = cloudinary.uploader.upload(
-                file,
-                resource_type='raw',
-                folder=folder,
-                public_id=object_name,
-                type='upload',
-                access_mode='public',
-                overwrite=True,
-                use_filename=True,
-                unique_filename=False
-            )
-            return res.get('secure_url') or res.get('url')
-        except Exception as e:
-            print(f"Error uploading to Cloudinary: {e}")
-            return None
+        stream = file.stream if hasattr(file, 'stream') else file
+        # Cloudinary chunks must be at least 5MB
+        chunk_size = max(self.app.config.get('UPLOAD_CHUNK_SIZE', 8 * 1024 * 1024), 5 * 1024 * 1024)
+        retries = self.app.config.get('UPLOAD_RETRIES', 2)
+        for attempt in range(retries + 1):
+            try:
+                # Ensure stream pointer at start
+                stream.seek(0)
+                # upload_large POSTs fixed-size chunks and closes its input when done;
+                # keep the stream open so retries and the S3/local fallback can read it
+                res = cloudinary.uploader.upload_large(
+                    _NonClosingStream(stream),
+                    chunk_size=chunk_size,
+                    resource_type='raw',
+                    folder=folder,
+                    public_id=object_name,
+                    type='upload',
+                    access_mode='public',
+                    overwrite=True,
+                    use_filename=True,
+                    unique_filename=False
+                )
+                return res.get('secure_url') or res.get('url')
+            except Exception as e:
+                print(f"Error uploading to Cloudinary (attempt {attempt + 1}): {e}")
+                if attempt < retries:
+                    time.sleep(0.5 * 2 ** attempt)
+        return None
+    
+    def process_and_upload(self, file, object_name=None):
+        """Extract an uploaded PDF's metadata and upload it from the same stream.
+
+        Returns a (url, pdf_info) tuple; url is None when the upload failed.
+        """
+        if object_name is None:
+            object_name = secure_filename(file.filename)
+        pdf_info = self.get_pdf_info(file)
+        url = self.upload_file(file, object_name)
+        return url, pdf_info
     
     def get_pdf_info(self, file):
-        """Extract PDF metadata"""
+        """Extract PDF metadata by parsing the seekable stream in place"""
+        stream = file.stream if hasattr(file, 'stream') else file
         try:
-            # Reset file pointer
-            file.seek(0)
-            pdf_reader = PdfReader(io.BytesIO(file.read()))
+            file_size = stream.seek(0, os.SEEK_END)
+            stream.seek(0)
             
             return {
-                'page_count': len(pdf_reader.pages),
-                'file_size': len(file.getvalue()) if hasattr(file, 'getvalue') else file.content_length
+                'page_count': _count_pages(stream),
+                'file_size': file_size
             }
         except Exception as e:
             print(f"Error reading PDF: {e}")
@@ -141,6 +260,9 @@ class CloudStorage:
                 'page_count': 0,
                 'file_size': 0
             }
+        finally:
+            # Leave the stream rewound for the upload that follows
+            stream.seek(0)
 
 # Initialize storage
 storage = CloudStorage()
@@ -4,15 +4,33 @@ from sqlalchemy.pool import NullPool
 
 load_dotenv()
 
+# Accepted upload types; app.security and app.models derive their checks from this
+ALLOWED_EXTENSIONS = frozenset({'pdf'})
+
+# psycopg2 batching for executemany: multi-row INSERT ... VALUES pages and
+# execute_batch() for UPDATE/DELETE
+_PSYCOPG2_BATCH_OPTIONS = {
+    'executemany_mode': 'values_plus_batch',
+    'insertmanyvalues_page_size': 1000,
+    'executemany_batch_page_size': 500,
+}
+
+def _uses_psycopg2(uri):
+    return (uri or '').split('://', 1)[0] in ('postgres', 'postgresql', 'postgresql+psycopg2')
+
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-secret-key-change-in-production'
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'sqlite:///tower_docs.db'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
-    # Serverless-friendly engine options (no connection pooling across invocations)
+    SQLALCHEMY_ECHO = os.environ.get('SQLALCHEMY_ECHO') == '1'
     SQLALCHEMY_ENGINE_OPTIONS = {
         'pool_pre_ping': True,
-        'poolclass': NullPool,
     }
+    # Serverless-friendly engine options (no connection pooling across invocations)
+    if os.environ.get('VERCEL'):
+        SQLALCHEMY_ENGINE_OPTIONS['poolclass'] = NullPool
+    if _uses_psycopg2(SQLALCHEMY_DATABASE_URI):
+        SQLALCHEMY_ENGINE_OPTIONS.update(_PSYCOPG2_BATCH_OPTIONS)
     
     # Cloud Storage Configuration
     AWS_ACCESS_KEY_ID = os.environ.get('AWS_ACCESS_KEY_ID')
@@ -28,24 +46,53 @@ class Config:
     CLOUDINARY_API_SECRET = os.environ.get('CLOUDINARY_API_SECRET')
     CLOUDINARY_FOLDER = os.environ.get('CLOUDINARY_FOLDER', 'tower-docs')
      
+    # Shared rate-limit counters (optional)
+    REDIS_URL = os.environ.get('REDIS_URL')
+     
     # Admin Configurations
     ADMIN_USERNAME = os.environ.get('ADMIN_USERNAME')
     ADMIN_PASSWORD = os.environ.get('ADMIN_PASSWORD')
     
     # Upload Configuration
     MAX_CONTENT_LENGTH = 10 * 1024 * 1024  # 10MB max file size
-    ALLOWED_EXTENSIONS = {'pdf'}
+    UPLOAD_CHUNK_SIZE = int(os.environ.get('UPLOAD_CHUNK_SIZE', 8 * 1024 * 1024))
+    UPLOAD_PARALLELISM = int(os.environ.get('UPLOAD_PARALLELISM', 4))
+    UPLOAD_RETRIES = int(os.environ.get('UPLOAD_RETRIES', 2))
+    ALLOWED_EXTENSIONS = ALLOWED_EXTENSIONS
 
 class DevelopmentConfig(Config):
     DEBUG = True
+    NPLUSONE_ENABLED = True
+    # Applied to every new SQLite connection; trades crash durability for write speed
+    SQLITE_PRAGMAS = (
+        'PRAGMA journal_mode=WAL',
+        'PRAGMA synchronous=NORMAL',
+        'PRAGMA temp_store=MEMORY',
+        'PRAGMA cache_size=-64000',
+    )
 
 class ProductionConfig(Config):
     DEBUG = False
+    TEMPLATES_AUTO_RELOAD = False
+    SQLALCHEMY_ECHO = False
     # In production, require DATABASE_URL to be set to avoid falling back to SQLite
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL')
     if not SQLALCHEMY_DATABASE_URI:
         # Keep a sentinel so app fails early with a helpful message
         raise RuntimeError('DATABASE_URL is not set. Configure Supabase connection string with ?sslmode=require')
+    # Long-running servers (gunicorn/uwsgi) reuse connections instead of
+    # paying a TLS + auth handshake per request
+    if not os.environ.get('VERCEL'):
+        SQLALCHEMY_ENGINE_OPTIONS = {
+            'pool_pre_ping': True,
+            'pool_size': 5,
+            'max_overflow': 10,
+            'pool_recycle': 1800,
+        }
+        if SQLALCHEMY_DATABASE_URI.startswith('postgres'):
+            SQLALCHEMY_ENGINE_OPTIONS['connect_args'] = {'keepalives': 1}
+        if _uses_psycopg2(SQLALCHEMY_DATABASE_URI):
+            SQLALCHEMY_ENGINE_OPTIONS.update(_PSYCOPG2_BATCH_OPTIONS)
 
 config = {
     'development': DevelopmentConfig,
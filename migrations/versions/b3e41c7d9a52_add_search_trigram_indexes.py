@@ -0,0 +1,44 @@
+"""add search trigram indexes
+
+Revision ID: b3e41c7d9a52
+Revises: 5597ba2dc2a8
+Create Date: 2026-10-15 09:12:04.118734
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b3e41c7d9a52'
+down_revision = '5597ba2dc2a8'
+branch_labels = None
+depends_on = None
+
+# GIN trigram indexes let Postgres serve the unanchored ILIKE '%q%' search
+TRIGRAM_INDEXES = (
+    ('ix_variant_code_trgm', 'tower_variants', 'tower_code'),
+    ('ix_variant_type_trgm', 'tower_variants', 'structural_type'),
+    ('ix_category_name_trgm', 'tower_categories', 'name'),
+)
+
+
+def upgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    inspector = sa.inspect(op.get_bind())
+    for name, table, column in TRIGRAM_INDEXES:
+        # No migration creates the tower tables; skip them on a fresh database
+        if not inspector.has_table(table):
+            continue
+        op.create_index(name, table, [sa.text(f'{column} gin_trgm_ops')], postgresql_using='gin')
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    inspector = sa.inspect(op.get_bind())
+    for name, table, _ in TRIGRAM_INDEXES:
+        if inspector.has_table(table):
+            op.drop_index(name, table_name=table)
@@ -0,0 +1,48 @@
+"""add composite query indexes
+
+Revision ID: d7a2f0e6c184
+Revises: b3e41c7d9a52
+Create Date: 2026-10-15 09:40:31.552907
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd7a2f0e6c184'
+down_revision = 'b3e41c7d9a52'
+branch_labels = None
+depends_on = None
+
+
+# The tower tables predate migrations: on a fresh database they are created
+# later by create_all() (flask init-db), already carrying these indexes
+COMPOSITE_INDEXES = (
+    ('ix_doc_variant_active_ts', 'tower_documents', ['variant_id', 'is_active', sa.text('upload_timestamp DESC')]),
+    ('ix_variant_category_height', 'tower_variants', ['category_id', 'height']),
+    ('ix_slider_active_order', 'sliders', ['is_active', 'order']),
+)
+
+
+def _index_names(inspector, table):
+    """Index names on table, or None when the table does not exist"""
+    if not inspector.has_table(table):
+        return None
+    return {index['name'] for index in inspector.get_indexes(table)}
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    for name, table, columns in COMPOSITE_INDEXES:
+        existing = _index_names(inspector, table)
+        if existing is not None and name not in existing:
+            op.create_index(name, table, columns)
+
+
+def downgrade():
+    inspector = sa.inspect(op.get_bind())
+    for name, table, _ in reversed(COMPOSITE_INDEXES):
+        existing = _index_names(inspector, table)
+        if existing is not None and name in existing:
+            op.drop_index(name, table_name=table)
@@ -0,0 +1,49 @@
+"""timestamp server defaults
+
+Revision ID: e5c9a1b7f320
+Revises: d7a2f0e6c184
+Create Date: 2026-10-15 11:05:47.903216
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5c9a1b7f320'
+down_revision = 'd7a2f0e6c184'
+branch_labels = None
+depends_on = None
+
+# Timestamp columns now filled by the database instead of Python
+TIMESTAMP_COLUMNS = {
+    'sliders': ('created_at', 'updated_at'),
+    'visitor_stats': ('last_visit',),
+    'tower_categories': ('created_at', 'updated_at'),
+    'tower_variants': ('created_at', 'updated_at'),
+    'tower_documents': ('upload_timestamp',),
+}
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    for table, columns in TIMESTAMP_COLUMNS.items():
+        # Tables created later by create_all() already carry the defaults
+        if not inspector.has_table(table):
+            continue
+        with op.batch_alter_table(table) as batch_op:
+            for column in columns:
+                batch_op.alter_column(column, existing_type=sa.DateTime(),
+                                      server_default=sa.func.now())
+
+
+def downgrade():
+    inspector = sa.inspect(op.get_bind())
+    for table, columns in TIMESTAMP_COLUMNS.items():
+        # Tables created later by create_all() already carry the defaults
+        if not inspector.has_table(table):
+            continue
+        with op.batch_alter_table(table) as batch_op:
+            for column in columns:
+                batch_op.alter_column(column, existing_type=sa.DateTime(),
+                                      server_default=None)
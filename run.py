@@ -1,36 +1,27 @@
 #!/usr/bin/env python3
 """
 Development server for Tower Documentation System
+
+The application is only built when this file is executed directly; WSGI
+servers and the flask CLI use the factory instead, e.g.
+gunicorn 'run:create_app()' or FLASK_APP=run.py flask shell.
 """
 
 import os
-from app import create_app, db
-from app.models import TowerCategory, TowerVariant, TowerDocument
-
-# Create Flask application
-app = create_app(os.getenv('FLASK_CONFIG') or 'default')
-
-@app.shell_context_processor
-def make_shell_context():
-    """Make database models available in Flask shell"""
-    return {
-        'db': db, 
-        'TowerCategory': TowerCategory, 
-        'TowerVariant': TowerVariant, 
-        'TowerDocument': TowerDocument
-    }
-
-@app.before_request
-def create_tables():
-    """Create database tables if they don't exist"""
-    if not hasattr(app, '_tables_created'):
-        db.create_all()
-        app._tables_created = True
+from app import create_app, create_missing_tables
 
 if __name__ == '__main__':
+    # Create Flask application
+    app = create_app()
+    
+    # No migration creates the tower tables; create them once before serving
+    with app.app_context():
+        create_missing_tables()
+    
     # Development server configuration
     app.run(
         host='0.0.0.0',
         port=int(os.environ.get('PORT', 5000)),
-        debug=True
+        # Debugger and reloader are opt-in: FLASK_DEBUG=1
+        debug=os.environ.get('FLASK_DEBUG', '0') == '1'
     )